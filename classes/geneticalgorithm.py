@@ -1,6 +1,4 @@
 import numpy as np
-import random
-from scipy.spatial import distance
 from pychord import Chord as pyChord
 
 
@@ -11,11 +9,12 @@ class GeneticAlgorithm():
 
     def __init__(self, standard_chord=None, min_note=48, max_note=72,
                  n_gen=100, size=100, n_best=40, n_rand=10, n_children=5,
-                 mutation_rate=0.05, stopping=None):
+                 mutation_rate=0.05, stopping=None, seed=None):
         """
         Constructor.
 
-        :param standard_chord: standard chord the algorithm evolves to
+        :param standard_chord: standard chord the algorithm evolves to. If None,
+            `reset` must be called with a chord before evolving
         :param min_note: int (default=48), lower midi note
         :param max_note: int (default=72), higher midi note
         :param n_gen: int (default=100) number of maximum evolutionary generations
@@ -29,7 +28,7 @@ class GeneticAlgorithm():
         :param stopping: int (default=None), if not none defines the minimum
             distance between the best and the current best chromosome as a
             stopping criterion
-
+        :param seed: int (default=None), seed of the random number generator
 
         Example:
 
@@ -41,8 +40,6 @@ class GeneticAlgorithm():
         # supported midi notes
         self.midi_notes = np.arange(min_note, max_note)
 
-        self._check_chord(standard_chord)
-        self.standard_chromosome = self._chord_to_chromosome(standard_chord)
         self.n_gen = n_gen
         self.size = size
         self.n_best = n_best
@@ -50,13 +47,31 @@ class GeneticAlgorithm():
         self.n_children = n_children
         self.mutation_rate = mutation_rate
         self.stopping = stopping
-        self.population = self._initilize()
+        self.rng = np.random.RandomState(seed)
 
         # best chromosome eat each iteration
         self.best_chromosomes = []
         self.scores_best = []
         self.scores_avg = []
 
+        self.standard_chromosome = None
+        self.population = None
+        if standard_chord is not None:
+            self.reset(standard_chord)
+
+    def reset(self, standard_chord):
+        """
+        Set a new standard chord and initilize the population at random, so
+        that the same instance can be reused to evolve towards different
+        chords.
+
+        :param standard_chord: standard chord the algorithm evolves to
+        """
+
+        self._check_chord(standard_chord)
+        self.standard_chromosome = self._chord_to_chromosome(standard_chord)
+        self.population = self._initilize()
+
     def _check_chord(self, chord):
         """
         Check chord.
@@ -87,136 +102,104 @@ class GeneticAlgorithm():
         Chord to chromosome mask.
 
         :param chord: list of midi notes.
-        :return chromo: chromosome mask, as list of bool representing midi note
-            numbers
+        :return chromo: chromosome mask, as np.ndarray of bool representing
+            midi note numbers
         """
 
-        chromo = []
-        for n in self.midi_notes:
-            if n in chord:
-                chromo.append(True)
-            else:
-                chromo.append(False)
-
-        return chromo
-
-    def _new_chromosome(self, threshold=0.5):
-        """
-        Instantiate new chromosome.
+        chord_set = set(chord)
+        return np.fromiter((n in chord_set for n in self.midi_notes),
+                           dtype=np.bool_, count=len(self.midi_notes))
 
-        :param threshold: float (default=0.3), controls notes to be included
-        :return chromo: chromosome mask, as list of bool representing midi note
-            numbers
+    def _initilize(self, threshold=0.5):
         """
+        Initilize population at random, redrawing the chromosomes with less
+        than 5 notes (or all the supported notes, if they are fewer).
 
-        chromo = np.ones(len(self.midi_notes), dtype=np.bool)
-        mask = np.random.rand(len(chromo)) < threshold
-        chromo[mask] = False
-        return chromo
-
-    def _initilize(self):
+        :param threshold: float (default=0.5), controls notes to be included
+        :return pop: np.ndarray of shape (size, n_notes), chromosome masks
         """
-        Initilize population at random.
 
-        :return pop: list of chromosome masks
-        """
+        n_notes = len(self.midi_notes)
+        min_notes = min(5, n_notes)
+        pop = self.rng.rand(self.size, n_notes) >= threshold
+        bad = np.count_nonzero(pop, axis=1) < min_notes
+        while bad.any():
+            pop[bad] = self.rng.rand(np.count_nonzero(bad), n_notes) >= threshold
+            bad = np.count_nonzero(pop, axis=1) < min_notes
 
-        pop = []
-        for i in range(self.size):
-            chromo = self._new_chromosome()
-            while len(chromo) < 5:
-                chromo = self._new_chromosome()
-            pop.append(chromo)
         return pop
 
-    def _cost(self, chromo):
+    def _fitness(self, pop):
         """
-        Calculates the cost function as eucledian distance between vectors
-        represented by the provided chromosome and the standard chromosome,
-        respectively.
+        Evaluate fitness of a population of chromosomes, as eucledian distance
+        from the standard chromosome, and returns the `n_best` chromosomes with
+        the relative scores, sorted by score. Only the best chromosomes are
+        sorted, after partitioning the population.
 
-        :param chromo: the chromosome to be evaluvated
-        :return distance: float, eucledian distance between chords
+        :param pop: np.ndarray of shape (size, n_notes), chromosomes
+        :return: (np.ndarray, np.ndarray) sorted best scores and chromosomes
         """
 
-        chromo_vec = []
-        for i in chromo:
-            if i:
-                chromo_vec.append(1)
-            else:
-                chromo_vec.append(0)
-
-        standard_chord_vec = []
-        for i in self.standard_chromosome:
-            if i:
-                standard_chord_vec.append(1)
-            else:
-                standard_chord_vec.append(0)
+        # for boolean vectors the eucledian distance is the square root of
+        # the hamming distance, computed for all chromosomes at once
+        diff = pop ^ self.standard_chromosome[None, :]
+        scores = np.sqrt(np.count_nonzero(diff, axis=1))
+        self.current_fitness = np.mean(scores)
 
-        chromo_vec = np.array(chromo_vec)
-        standard_chord_vec = np.array(standard_chord_vec)
+        n_best = min(self.n_best, len(scores))
+        best_idx = np.argpartition(scores, n_best - 1)[:n_best]
+        best_idx = best_idx[np.argsort(scores[best_idx], kind='stable')]
 
-        return distance.euclidean(chromo_vec, standard_chord_vec)
+        return scores[best_idx], pop[best_idx]
 
-    def _fitness(self, pop):
+    def _select(self, pop_best, pop):
         """
-        Evaluate fitness of a list of chromoosmes and returns the sorted lists
-        of scores and relative chromosomes.
+        Select the `n_best` chromosomes and other `n_rand` chromosomes at
+        random from the whole population. In this way we push the algorithm
+        towards the solution and we avoid converging to local minimum.
 
-        :param pop: list of chromosomes
-        :return: (list, list) sorted lists
+        :param pop_best: np.ndarray, best chromosomes
+        :param pop: np.ndarray, whole population of chromosomes
+        :return: np.ndarray of chromosomes
         """
 
-        scores = []
-        for chromo in pop:
-            scores.append(self._cost(chromo))
-
-        scores, pop = np.array(scores), np.array(pop)
-        inds = np.argsort(scores)
-        self.current_fitness = np.mean(scores)
+        idx = self.rng.randint(0, pop.shape[0], size=self.n_rand)
+        pop_next = np.concatenate([pop_best, pop[idx]], axis=0)
+        self.rng.shuffle(pop_next)
 
-        return list(scores[inds]), list(pop[inds, :])
+        return pop_next
 
-    def _select(self, pop_sorted):
+    def _repair(self, pop):
         """
-        Select the first `n_best` chromosomes according to the sorted list,
-        and other `n_rand` chromosomes from all the same list. In this way
-        we push the algorithm towards the solution and we avoid converging to
-        local minimum.
+        Replace in place the chromosomes with less than 3 notes by the
+        standard chromosome.
 
-        :param pop_sorted: list of chromosomes
-        :return: list of chromosomes
+        :param pop: np.ndarray of chromosomes
+        :return: np.ndarray of chromosomes
         """
 
-        pop_next = pop_sorted[: self.n_best]
-        for i in range(self.n_rand):
-            pop_next.append(random.choice(pop_sorted))
-        random.shuffle(pop_next)
+        pop[np.count_nonzero(pop, axis=1) < 3] = self.standard_chromosome
 
-        return pop_next
+        return pop
 
     def _crossover(self, pop):
         """
-        Performs crossover between a population of chromosomes.
+        Performs crossover between a population of chromosomes. The children
+        are newly allocated, the parent population is left unchanged.
 
-        :param pop: list of chromosomes
+        :param pop: np.ndarray of chromosomes
         :return: population of chromosomes after crossover
         """
 
-        pop_next = []
-        for i in range(int(len(pop) / 2)):
-            for j in range(self.n_children):
-                chromo1, chromo2 = pop[i], pop[len(pop) - 1 - i]
-                child = chromo1
-                mask = np.random.rand(len(child)) > 0.5
-                child[mask] = chromo2[mask]
-                # TODO: condition on chromosomes with len < 3
-                if sum(child) < 3:
-                    pop_next.append(np.array(self.standard_chromosome))
-                else:
-                    pop_next.append(child)
+        # the i-th chromosome is paired with the i-th from the end, and each
+        # pair generates `n_children` children
+        half = int(len(pop) / 2)
+        parents1 = np.repeat(pop[:half], self.n_children, axis=0)
+        parents2 = np.repeat(pop[::-1][:half], self.n_children, axis=0)
+        mask = self.rng.rand(*parents1.shape) > 0.5
+        pop_next = np.where(mask, parents2, parents1)
 
-        return pop_next
+        return self._repair(pop_next)
 
     def _mutate(self, pop, p=0.05):
         """
@@ -224,23 +207,16 @@ class GeneticAlgorithm():
         defined in constructor, by excluding each note from each chromosome
         with given exclusion probability.
 
-        :param pop: list of chromosomes
+        :param pop: np.ndarray of chromosomes
         :param p: float (default=0.05), exclusion probability
-        :return: list of chromosomes after mutation
+        :return: np.ndarray of chromosomes after mutation
         """
 
-        pop_next = []
-        for chromo in pop:
-            if random.random() < self.mutation_rate:
-                mask = np.random.rand(len(chromo)) < p
-                chromo[mask] = False
-            # TODO: condition on chromosomes with len < 3
-            if sum(chromo) < 3:
-                pop_next.append(self.standard_chromosome)
-            else:
-                pop_next.append(chromo)
+        select = self.rng.rand(len(pop)) < self.mutation_rate
+        drop = self.rng.rand(*pop.shape) < p
+        pop &= ~(select[:, None] & drop)
 
-        return pop_next
+        return self._repair(pop)
 
     def get_best_chords(self, n_rep_last=None):
         """
@@ -268,20 +244,20 @@ class GeneticAlgorithm():
         """
         Calls all genetic operations and saves the history of each generation.
 
-        :param pop: list of chromosomes
-        :return: processed list of chromosomes
+        :param pop: np.ndarray of shape (size, n_notes), chromosomes
+        :return: np.ndarray of processed chromosomes
         """
 
+        scores_best, pop_best = self._fitness(pop)
+        # history, copied before the genetic operations modify the selected
+        # chromosomes
+        self.best_chromosomes.append(pop_best[0].copy())
+        self.scores_best.append(scores_best[0])
+        self.scores_avg.append(self.current_fitness)
         # Selection, crossover and mutation
-        scores_sorted, pop_sorted = self._fitness(pop)
-        pop = self._select(pop_sorted)
+        pop = self._select(pop_best, pop)
         pop = self._crossover(pop)
         pop = self._mutate(pop)
-        # history
-        best_chromo = pop_sorted[0]
-        self.best_chromosomes.append(best_chromo)
-        self.scores_best.append(scores_sorted[0])
-        self.scores_avg.append(np.mean(scores_sorted))
 
         return pop
 
@@ -291,17 +267,25 @@ class GeneticAlgorithm():
         evolutionary step.
 
         :return best_chords: list best chords across evolution
+        :raise ValueError: if no standard chord has been set
         """
 
-        iteration = 0
-        while iteration < self.n_gen:
-            iteration += 1
+        if self.population is None:
+            raise ValueError("No standard chord provided. Please provide it "
+                             "in the constructor or by calling `reset`.")
 
-            if iteration > 2:
-                if self.stopping:
-                        cchromo = self.best_chromosomes[-1]
-                        if (self._cost(cchromo) < self.stopping) and (len(cchromo == 3)):
-                            return self.get_best_chords()
+        self.best_chromosomes = []
+        self.scores_best = []
+        self.scores_avg = []
+        while len(self.scores_best) < self.n_gen:
+
+            # stop when the best chromosome of the last generation is a
+            # triad close enough to the standard chromosome
+            if self.stopping is not None and len(self.scores_best) > 1:
+                best_chromo = self.best_chromosomes[-1]
+                if (self.scores_best[-1] < self.stopping and
+                        np.count_nonzero(best_chromo) == 3):
+                    return self.get_best_chords()
 
             self.population = self._generate(self.population)
 
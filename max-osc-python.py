@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 
 # standard Python modules
-import time, argparse, random
+import argparse, multiprocessing
 import numpy as np
 from itertools import cycle
 # Twisted networking framework
 import twisted.internet.reactor
+import twisted.internet.defer
 # TxOSC OpenSoundControl library
 import txosc.osc
 import txosc.dispatch
@@ -14,6 +15,9 @@ import txosc.async
 # using the following UDP port numbers:
 PYTHON_NODE_RECV_PORT = 12001
 PYTHON_NODE_SEND_PORT = 12000
+# seconds after which an evolution of the genetic algorithm is given up, e.g.
+# if its worker process died
+EVOLVE_TIMEOUT = 60
 # genetic algorithm class
 from classes.geneticalgorithm import GeneticAlgorithm
 
@@ -31,6 +35,46 @@ progression_cycled = cycle(progression)
 iterprogression = iter(progression_cycled)
 
 
+# genetic algorithm of each worker process, built once by `init_worker` with
+# the fixed parameters and reset to each chord of the progression
+worker_ga = None
+
+
+def init_worker():
+    """ Build the genetic algorithm of a worker process. """
+
+    global worker_ga
+
+    # worker_ga = GeneticAlgorithm(
+    #                     n_best=30, # 40
+    #                     n_rand=20, # 20
+    #                     mutation_rate=0.04, # 0.04
+    #                     stopping=0.5, # 0.5
+    #                     )
+
+    worker_ga = GeneticAlgorithm(
+                        n_best=40, # 40
+                        n_rand=20, # 20
+                        mutation_rate=0.05, # 0.04
+                        stopping=1.0,
+                        )
+
+
+def run_ga_for_chord(notes):
+    """
+    Evolve the genetic algorithm of the worker process towards the given chord
+    notes and return the best chords of each evolutionary step. Errors are
+    returned rather than raised, since `Pool.apply_async` has no error callback
+    on Python 2.
+    """
+
+    try:
+        worker_ga.reset(notes)
+        return worker_ga.evolve()
+    except Exception as e:
+        return e
+
+
 class OscServer(object):
     """
     The OscServer class holds all the application state: communication ports,
@@ -44,6 +88,13 @@ class OscServer(object):
         self.send_portnum=send_port
         self._reactor=None
         self._ping_count=0
+        self._send_host=None
+        # worker processes evolving the genetic algorithm (at most the current
+        # and the next chord are evolved at once), and the next chord of the
+        # progression with its pending trajectory
+        self._pool=multiprocessing.Pool(processes=2, initializer=init_worker)
+        self._next_chord=None
+        self._next_trajectory=None
 
         return
 
@@ -54,6 +105,7 @@ class OscServer(object):
         """
 
         self._reactor = reactor
+        reactor.addSystemEventTrigger('before', 'shutdown', self._pool.terminate)
         self.receiver = txosc.dispatch.Receiver()
         self._server_protocol = txosc.async.DatagramServerProtocol(self.receiver)
         self._server_port = reactor.listenUDP(self.recv_portnum, self._server_protocol, maxPacketSize=60000)
@@ -112,56 +164,108 @@ class OscServer(object):
 
         if self.verbose: print("Generating next chord.")
 
-        while True:
-            chord = next(iterprogression)
-            print()
-            print('Switching to chord:', chord['name'])
-            print(chord['notes'])
-            # send current chord target to host
-            chord_msg = [int(val) for val in chord['notes']]
-            msg = txosc.osc.Message("/target_chord", *chord_msg)
-            # send the trajectory back to the source of the request
-            send_host = address[0]
-            self._client_protocol.send(msg, (send_host, self.send_portnum))
-
-            # evolve genetic algorithm
-            print('Evolving Genetic Algorithm...')
-            # ga = GeneticAlgorithm(
-            #                     standard_chord=chord['notes'],
-            #                     n_best=30, # 40
-            #                     n_rand=20, # 20
-            #                     mutation_rate=0.04, # 0.04
-            #                     stopping=0.5, # 0.5
-            #                     )
-
-            ga = GeneticAlgorithm(
-                                standard_chord=chord['notes'],
-                                n_best=40, # 40
-                                n_rand=20, # 20
-                                mutation_rate=0.05, # 0.04
-                                stopping=1.0,
-                                )
-
-            evol_chords = ga.evolve()
-
-            for chord in evol_chords:
-                # Reformat evol_chords for sending as an OSC message.
-                chord_msg = [int(val) for val in chord]
-                msg = txosc.osc.Message("/trajectory", *chord_msg)
-                # send the trajectory back to the source of the request
-                send_host = address[0]
-                self._client_protocol.send(msg, (send_host, self.send_portnum))
-                # sample from shifted Poisson distribution with lbd=1, size=1
-                # wait until next Poisson event
-
-                # dt = np.random.poisson(1, 1) + 1.2
-                # dt = np.random.power(1, 1)[0] + 1.8
-                dt = np.random.gamma(1, 1, 1)[0] + 1.1
-
-                time.sleep(dt)
-
-            # wait until next initialization
-            time.sleep(1.2)
+        # the trajectories are sent back to the source of the request
+        already_running = self._send_host is not None
+        self._send_host = address[0]
+        if not already_running:
+            self._prefetch()
+            self._schedule_next()
+
+        return
+
+    def _prefetch(self):
+        """
+        Start evolving the genetic algorithm for the next chord of the
+        progression in the process pool. The trajectory is delivered to a
+        deferred fired in the reactor thread, so that the reactor keeps
+        processing OSC messages and no thread blocks on the pool.
+        """
+
+        chord = next(iterprogression)
+        print('Evolving Genetic Algorithm for chord:', chord['name'])
+        d = twisted.internet.defer.Deferred()
+        d.addTimeout(EVOLVE_TIMEOUT, self._reactor)
+        self._pool.apply_async(run_ga_for_chord, (chord['notes'],),
+                               callback=lambda result: self._reactor.callFromThread(self._evolve_done, d, result))
+        self._next_chord = chord
+        self._next_trajectory = d
+
+        return
+
+    def _evolve_done(self, d, result):
+        """ fire the deferred of an evolution with its result or error """
+
+        # a timed out deferred is already cancelled and ignores the result
+        if isinstance(result, Exception):
+            d.errback(result)
+        else:
+            d.callback(result)
+
+        return
+
+    def _schedule_next(self):
+        """
+        Switch to the prefetched chord of the progression, and start evolving
+        the following one while the current trajectory is being sent.
+        """
+
+        chord, d = self._next_chord, self._next_trajectory
+        self._prefetch()
+
+        print()
+        print('Switching to chord:', chord['name'])
+        print(chord['notes'])
+        # send current chord target to host
+        chord_msg = [int(val) for val in chord['notes']]
+        msg = txosc.osc.Message("/target_chord", *chord_msg)
+        self._client_protocol.send(msg, (self._send_host, self.send_portnum))
+
+        d.addCallbacks(self._send_trajectory, self._evolve_failed)
+
+        return
+
+    def _evolve_failed(self, failure):
+        """
+        Log a failed evolution of the genetic algorithm and move on to the next
+        chord of the progression, so that the loop keeps running.
+        """
+
+        print('Evolving Genetic Algorithm failed:', failure.getErrorMessage())
+        if self.verbose: failure.printTraceback()
+
+        # wait until next initialization
+        self._reactor.callLater(1.2, self._schedule_next)
+
+        return
+
+    def _send_trajectory(self, evol_chords):
+        """
+        Schedule the evolved chords to be sent to Max Msp, and the next chord
+        of the progression afterwards.
+        """
+
+        # sample the waiting times between chords from a shifted distribution
+        # with lbd=1, the first chord is sent straight away
+
+        # dts = np.random.poisson(1, len(evol_chords)) + 1.2
+        # dts = np.random.power(1, len(evol_chords)) + 1.8
+        dts = np.random.gamma(1, 1, len(evol_chords)) + 1.1
+        cum = np.cumsum(dts)
+        for chord, t in zip(evol_chords, np.concatenate([[0.], cum[:-1]])):
+            self._reactor.callLater(t, self._send_one, chord)
+
+        # wait until next initialization
+        self._reactor.callLater(cum[-1] + 1.2, self._schedule_next)
+
+        return
+
+    def _send_one(self, chord):
+        """ send one evolved chord of the trajectory to Max Msp """
+
+        # Reformat chord for sending as an OSC message.
+        chord_msg = [int(val) for val in chord]
+        msg = txosc.osc.Message("/trajectory", *chord_msg)
+        self._client_protocol.send(msg, (self._send_host, self.send_portnum))
 
         return
 
@@ -0,0 +1,50 @@
+import numpy as np
+from classes.geneticalgorithm import GeneticAlgorithm
+
+
+def test_crossover_leaves_parents_unchanged():
+    ga = GeneticAlgorithm(standard_chord=[48, 52, 67], seed=0)
+    pop = ga.population
+    snapshot = pop.copy()
+
+    ga._crossover(pop)
+
+    assert np.array_equal(pop, snapshot)
+
+
+def test_reset_to_new_chord():
+    ga = GeneticAlgorithm(seed=0)
+    assert ga.population is None
+
+    ga.reset([55, 59, 62])
+    best_chords = ga.evolve()
+
+    assert len(best_chords) == len(ga.scores_best)
+    assert np.array_equal(ga.midi_notes[ga.standard_chromosome], [55, 59, 62])
+
+
+def test_evolve_without_standard_chord():
+    ga = GeneticAlgorithm(seed=0)
+
+    try:
+        ga.evolve()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError not raised")
+
+
+def test_initilize_with_less_than_5_supported_notes():
+    ga = GeneticAlgorithm(standard_chord=[48, 49, 50], min_note=48,
+                          max_note=52, seed=0)
+
+    assert ga.population.shape == (ga.size, 4)
+    assert np.all(np.count_nonzero(ga.population, axis=1) >= 4)
+
+
+def test_history_has_one_entry_per_generation():
+    ga = GeneticAlgorithm(standard_chord=[48, 52, 67], stopping=1.0, seed=1)
+    best_chords = ga.evolve()
+
+    assert len(ga.scores_best) == len(best_chords) < ga.n_gen
+    assert len(ga.scores_avg) == len(ga.best_chromosomes) == len(best_chords)